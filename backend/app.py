@@ -1,15 +1,29 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import os
 import uuid
+import hashlib
+import logging
+import shutil
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-import traceback
 
 from pdf_parser import PDFParser
 from transaction_processor import TransactionProcessor
 from excel_generator import ExcelGenerator
 from google_sheets_exporter import GoogleSheetsExporter
+from job_store import JobStore
+
+# Only warnings and errors are logged unless LOG_LEVEL is lowered (e.g. INFO)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'WARNING').upper(),
+                    format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+log = logging.getLogger(__name__)
 
 # Update Flask to serve frontend static files
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -30,13 +44,65 @@ UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
 ALLOWED_EXTENSIONS = {'pdf'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_BUFFER_SIZE = 1024 * 1024  # write uploads to disk in 1MB chunks
+JOB_TTL = int(os.environ.get('JOB_TTL', 3600))  # seconds
+# How often the background sweeper removes expired jobs and files
+SWEEP_INTERVAL = int(os.environ.get('SWEEP_INTERVAL', 300))  # seconds
+PIPELINE_WORKERS = int(os.environ.get('PIPELINE_WORKERS', os.cpu_count() or 1))
+# Re-uploads of an identical PDF reuse the earlier Excel output for this many
+# seconds. Disabled by default because it keeps a copy of the output on the server.
+RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 0))
+CACHE_FOLDER = os.path.join(OUTPUT_FOLDER, 'cache')
+# Behind nginx, set this to an internal location aliased to OUTPUT_FOLDER
+# (e.g. /_outputs/) and nginx will send downloads itself
+X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '')
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Werkzeug rejects larger request bodies before they are read. The extra
+# allowance covers the multipart boundaries and the output_format field.
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE + 64 * 1024
 
 # Create necessary directories
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+if RESULT_CACHE_TTL:
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+
+# Store job data in Redis when REDIS_URL is set so every worker sees the same jobs,
+# otherwise keep it in memory (single worker only)
+jobs = JobStore(os.environ.get('REDIS_URL'), ttl=JOB_TTL)
+
+# Excel results keyed by a hash of the uploaded bytes
+result_cache = JobStore(os.environ.get('REDIS_URL'), ttl=RESULT_CACHE_TTL, key_prefix='excel:')
 
-# Store job data in memory (in production, use Redis or database)
-jobs = {}
+# Conversions run in worker processes so concurrent uploads are parsed on
+# separate cores instead of contending for the GIL
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the shared process pool, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PIPELINE_WORKERS)
+        return _executor
+
+
+def reset_executor(broken):
+    """
+    Drop a broken process pool so the next request starts a fresh one
+    
+    Args:
+        broken: The pool that raised BrokenProcessPool. Nothing is dropped if another
+            request has already replaced it.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False)
 
 
 def allowed_file(filename):
@@ -44,6 +110,137 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def save_upload(file, upload_path):
+    """
+    Write an uploaded file to disk and return a hash of its contents
+    
+    Raises:
+        RequestEntityTooLarge: If the file is larger than MAX_FILE_SIZE.
+            The partially written file is removed.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    total = 0
+    with open(upload_path, 'wb') as out:
+        while True:
+            chunk = file.stream.read(UPLOAD_BUFFER_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > MAX_FILE_SIZE:
+                break
+            hasher.update(chunk)
+            out.write(chunk)
+    
+    if total > MAX_FILE_SIZE:
+        os.remove(upload_path)
+        raise RequestEntityTooLarge()
+    
+    return hasher.hexdigest()
+
+
+def get_cached_result(file_hash, upload_path, job_id):
+    """
+    Reuse the Excel output of an identical earlier upload
+    
+    Returns:
+        tuple: (response payload, job data) or None on a cache miss
+    """
+    cached = result_cache.get(file_hash)
+    if not cached:
+        return None
+    
+    # Each job gets its own copy so /api/cleanup never removes the cached file
+    excel_path = os.path.join(OUTPUT_FOLDER, f"{job_id}_transactions.xlsx")
+    try:
+        shutil.copyfile(cached['output_path'], excel_path)
+    except FileNotFoundError:
+        # Expired and removed by the sweeper, possibly after the lookup above
+        return None
+    
+    result = dict(cached['result'])
+    result['job_id'] = job_id
+    result['download_url'] = f"/api/download/{job_id}"
+    result['filename'] = f"{job_id}_transactions.xlsx"
+    
+    job_record = {
+        'upload_path': upload_path,
+        'output_path': excel_path,
+        'format': 'excel',
+        'created_at': datetime.now().isoformat()
+    }
+    
+    return result, job_record
+
+
+def cache_result(file_hash, result, job_record):
+    """Keep a copy of a job's Excel output for identical future uploads"""
+    cache_path = os.path.join(CACHE_FOLDER, f"{file_hash}.xlsx")
+    shutil.copyfile(job_record['output_path'], cache_path)
+    
+    cached = {key: value for key, value in result.items() if key not in ('job_id', 'download_url', 'filename')}
+    result_cache.set(file_hash, {'output_path': cache_path, 'result': cached})
+
+
+def remove_stale_files(folder, max_age):
+    """
+    Delete files directly inside a folder that are older than max_age seconds
+    
+    Returns:
+        int: Number of files removed
+    """
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return 0
+    
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Removed by /api/cleanup or another worker in the meantime
+            pass
+    
+    return removed
+
+
+def sweep_expired():
+    """Remove jobs and files that outlived their TTL because nobody called /api/cleanup"""
+    expired_jobs = jobs.purge_expired()
+    removed = remove_stale_files(UPLOAD_FOLDER, JOB_TTL) + remove_stale_files(OUTPUT_FOLDER, JOB_TTL)
+    if RESULT_CACHE_TTL:
+        result_cache.purge_expired()
+        removed += remove_stale_files(CACHE_FOLDER, RESULT_CACHE_TTL)
+    
+    if expired_jobs or removed:
+        log.info("Sweeper removed %d expired jobs and %d files", expired_jobs, removed)
+
+
+def _sweep_forever():
+    """Run sweep_expired every SWEEP_INTERVAL seconds"""
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        try:
+            sweep_expired()
+        except Exception as e:
+            log.exception("Error sweeping expired jobs: %s", e)
+
+
+# One sweeper per server process. Pipeline workers started with the spawn
+# method import this module too, but have nothing to sweep.
+if SWEEP_INTERVAL > 0 and multiprocessing.parent_process() is None:
+    threading.Thread(target=_sweep_forever, name='job-sweeper', daemon=True).start()
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def file_too_large(e):
+    """Return the size limit error as JSON"""
+    return jsonify({'error': f'File too large. Maximum size is {MAX_FILE_SIZE / (1024*1024)}MB'}), 413
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -53,6 +250,88 @@ def health_check():
     })
 
 
+class ConversionError(Exception):
+    """Raised when a PDF was read but produced no usable transactions"""
+
+
+def _run_pipeline(upload_path, output_format, job_id):
+    """
+    Parse a saved upload and generate the requested output
+    
+    Returns:
+        tuple: (response payload, job data to store or None)
+    """
+    log.info("Processing PDF: %s", upload_path)
+    
+    # Step 1: Extract text and parse transactions
+    parser = PDFParser(upload_path)
+    raw_transactions = parser.parse_transactions()
+    
+    if not raw_transactions:
+        raise ConversionError('No transactions found in PDF. Please ensure the PDF contains a bank statement with transaction data.')
+    
+    log.info("Found %d raw transactions", len(raw_transactions))
+    
+    # Step 2: Process and normalize transactions
+    processor = TransactionProcessor(raw_transactions)
+    transactions = processor.process()
+    
+    if not transactions:
+        raise ConversionError('Failed to process transactions. The PDF format may not be supported.')
+    
+    log.info("Processed %d transactions", len(transactions))
+    
+    # Get summary
+    summary = processor.get_summary()
+    
+    # Step 3: Generate output based on format
+    result = {
+        'job_id': job_id,
+        'status': 'success',
+        'transaction_count': len(transactions),
+        'summary': summary,
+        'output_format': output_format
+    }
+    
+    if output_format == 'google_sheets':
+        # Export to Google Sheets
+        try:
+            sheets_exporter = GoogleSheetsExporter()
+            sheet_title = f"Bank Transactions - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+            sheet_url = sheets_exporter.export_transactions(transactions, sheet_title)
+            
+            result['sheet_url'] = sheet_url
+            result['message'] = 'Successfully exported to Google Sheets'
+            
+            # Clean up immediately for Google Sheets
+            if os.path.exists(upload_path):
+                os.remove(upload_path)
+            
+            return result, None
+            
+        except FileNotFoundError:
+            # Google Sheets credentials not found
+            # Fall back to Excel
+            result['output_format'] = 'excel'
+            result['warning'] = 'Google Sheets credentials not configured. Generated Excel file instead.'
+    
+    # Generate Excel file
+    excel_gen = ExcelGenerator(transactions, OUTPUT_FOLDER)
+    excel_path = excel_gen.generate(f"{job_id}_transactions.xlsx")
+    
+    result['download_url'] = f"/api/download/{job_id}"
+    result['filename'] = f"{job_id}_transactions.xlsx"
+    
+    job_record = {
+        'upload_path': upload_path,
+        'output_path': excel_path,
+        'format': 'excel',
+        'created_at': datetime.now().isoformat()
+    }
+    
+    return result, job_record
+
+
 @app.route('/api/convert', methods=['POST'])
 def convert_pdf():
     """
@@ -73,14 +352,6 @@ def convert_pdf():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        # Check file size
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({'error': f'File too large. Maximum size is {MAX_FILE_SIZE / (1024*1024)}MB'}), 400
-        
         # Check file type
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Only PDF files are allowed'}), 400
@@ -94,114 +365,53 @@ def convert_pdf():
         # Generate unique job ID
         job_id = str(uuid.uuid4())
         
-        # Save uploaded file
+        # Save uploaded file, enforcing the size limit as it is written
         filename = secure_filename(file.filename)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         unique_filename = f"{job_id}_{timestamp}_{filename}"
         upload_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-        file.save(upload_path)
-        
-        # Process PDF
-        print(f"Processing PDF: {upload_path}")
-        
-        # Step 1: Extract text and parse transactions
-        parser = PDFParser(upload_path)
-        raw_transactions = parser.parse_transactions()
-        
-        if not raw_transactions:
-            # Clean up uploaded file
-            if os.path.exists(upload_path):
-                os.remove(upload_path)
-            return jsonify({
-                'error': 'No transactions found in PDF. Please ensure the PDF contains a bank statement with transaction data.'
-            }), 400
-        
-        print(f"Found {len(raw_transactions)} raw transactions")
+        file_hash = save_upload(file, upload_path)
         
-        # Step 2: Process and normalize transactions
-        processor = TransactionProcessor(raw_transactions)
-        transactions = processor.process()
-        
-        if not transactions:
-            # Clean up uploaded file
-            if os.path.exists(upload_path):
-                os.remove(upload_path)
-            return jsonify({
-                'error': 'Failed to process transactions. The PDF format may not be supported.'
-            }), 400
+        use_cache = RESULT_CACHE_TTL > 0 and output_format == 'excel'
+        cached = get_cached_result(file_hash, upload_path, job_id) if use_cache else None
         
-        print(f"Processed {len(transactions)} transactions")
+        if cached:
+            result, job_record = cached
+        else:
+            # Steps 1-3 are CPU-bound and run in the worker pool
+            executor = get_executor()
+            try:
+                future = executor.submit(_run_pipeline, upload_path, output_format, job_id)
+                result, job_record = future.result()
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); recreate the pool for later requests
+                reset_executor(executor)
+                raise
+            
+            if use_cache and job_record:
+                cache_result(file_hash, result, job_record)
         
-        # Get summary
-        summary = processor.get_summary()
+        if job_record:
+            jobs.set(job_id, job_record)
         
-        # Step 3: Generate output based on format
-        result = {
-            'job_id': job_id,
-            'status': 'success',
-            'transaction_count': len(transactions),
-            'summary': summary,
-            'output_format': output_format
-        }
+        return jsonify(result), 200
         
-        if output_format == 'excel':
-            # Generate Excel file
-            excel_gen = ExcelGenerator(transactions, OUTPUT_FOLDER)
-            excel_path = excel_gen.generate(f"{job_id}_transactions.xlsx")
-            
-            result['download_url'] = f"/api/download/{job_id}"
-            result['filename'] = f"{job_id}_transactions.xlsx"
-            
-            # Store job data
-            jobs[job_id] = {
-                'upload_path': upload_path,
-                'output_path': excel_path,
-                'format': 'excel',
-                'created_at': datetime.now().isoformat()
-            }
-            
-        elif output_format == 'google_sheets':
-            # Export to Google Sheets
-            try:
-                sheets_exporter = GoogleSheetsExporter()
-                sheet_title = f"Bank Transactions - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-                sheet_url = sheets_exporter.export_transactions(transactions, sheet_title)
-                
-                result['sheet_url'] = sheet_url
-                result['message'] = 'Successfully exported to Google Sheets'
-                
-                # Clean up immediately for Google Sheets
-                if os.path.exists(upload_path):
-                    os.remove(upload_path)
-                    
-            except FileNotFoundError:
-                # Google Sheets credentials not found
-                # Fall back to Excel
-                excel_gen = ExcelGenerator(transactions, OUTPUT_FOLDER)
-                excel_path = excel_gen.generate(f"{job_id}_transactions.xlsx")
-                
-                result['download_url'] = f"/api/download/{job_id}"
-                result['filename'] = f"{job_id}_transactions.xlsx"
-                result['output_format'] = 'excel'
-                result['warning'] = 'Google Sheets credentials not configured. Generated Excel file instead.'
-                
-                # Store job data
-                jobs[job_id] = {
-                    'upload_path': upload_path,
-                    'output_path': excel_path,
-                    'format': 'excel',
-                    'created_at': datetime.now().isoformat()
-                }
+    except RequestEntityTooLarge as e:
+        # Raised by Werkzeug or save_upload; save_upload removes its partial file
+        return file_too_large(e)
         
-        return jsonify(result), 200
+    except ConversionError as e:
+        # Clean up uploaded file
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+        return jsonify({'error': str(e)}), 400
         
     except Exception as e:
         # Clean up on error
         if 'upload_path' in locals() and os.path.exists(upload_path):
             os.remove(upload_path)
         
-        print(f"Error processing PDF: {str(e)}")
-        print(traceback.format_exc())
+        log.exception("Error processing PDF: %s", e)
         
         return jsonify({
             'error': f'Failed to process PDF: {str(e)}',
@@ -213,31 +423,46 @@ def convert_pdf():
 def download_file(job_id):
     """Download generated Excel file and clean up"""
     try:
-        if job_id not in jobs:
+        job_data = jobs.get(job_id)
+        if job_data is None:
             return jsonify({'error': 'Job not found or expired'}), 404
         
-        job_data = jobs[job_id]
         output_path = job_data['output_path']
         
         if not os.path.exists(output_path):
             return jsonify({'error': 'File not found'}), 404
         
-        # Send file
+        download_name = os.path.basename(output_path)
+        
+        if X_ACCEL_REDIRECT_PREFIX:
+            # Hand the transfer to nginx, which sends the file with sendfile()
+            response = Response(mimetype=XLSX_MIMETYPE)
+            response.headers['X-Accel-Redirect'] = X_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + download_name
+            response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+            return response
+        
+        # Send file. The frontend calls /api/cleanup afterwards; anything
+        # left behind is removed by the sweeper once the job expires.
+        # A retried download with a matching ETag or date gets a 304 and no body.
         response = send_file(
             output_path,
             as_attachment=True,
-            download_name=os.path.basename(output_path),
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            download_name=download_name,
+            mimetype=XLSX_MIMETYPE,
+            conditional=True,
+            etag=True,
+            last_modified=os.path.getmtime(output_path)
         )
         
-        # Schedule cleanup after download
-        # In a production environment, you'd use a background task
-        # For now, we'll add a cleanup endpoint
+        # Browsers may keep the file but must check it is still current
+        response.cache_control.private = True
+        response.cache_control.max_age = 0
+        response.cache_control.must_revalidate = True
         
         return response
         
     except Exception as e:
-        print(f"Error downloading file: {str(e)}")
+        log.exception("Error downloading file: %s", e)
         return jsonify({'error': 'Failed to download file'}), 500
 
 
@@ -245,28 +470,28 @@ def download_file(job_id):
 def cleanup_job(job_id):
     """Clean up job files after download"""
     try:
-        if job_id not in jobs:
+        job_data = jobs.get(job_id)
+        if job_data is None:
             return jsonify({'message': 'Job already cleaned up or not found'}), 200
         
-        job_data = jobs[job_id]
         
         # Delete uploaded PDF
         if os.path.exists(job_data['upload_path']):
             os.remove(job_data['upload_path'])
-            print(f"Deleted upload: {job_data['upload_path']}")
+            log.info("Deleted upload: %s", job_data['upload_path'])
         
         # Delete output file
         if os.path.exists(job_data['output_path']):
             os.remove(job_data['output_path'])
-            print(f"Deleted output: {job_data['output_path']}")
+            log.info("Deleted output: %s", job_data['output_path'])
         
-        # Remove job from memory
-        del jobs[job_id]
+        # Remove job from the store
+        jobs.delete(job_id)
         
         return jsonify({'message': 'Files cleaned up successfully'}), 200
         
     except Exception as e:
-        print(f"Error cleaning up job: {str(e)}")
+        log.exception("Error cleaning up job: %s", e)
         return jsonify({'error': 'Failed to clean up files'}), 500
 
 
@@ -1,101 +1,96 @@
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+import numpy as np
+import xlsxwriter
 from typing import List, Dict
 import os
 
+from transaction_processor import TEXT_FIELDS, AMOUNT_FIELDS, build_table
+
 
 class ExcelGenerator:
     """Generate formatted Excel spreadsheet from transaction data"""
-    
+
+    HEADERS = ["Date", "Description", "Reference", "Debit", "Credit", "Balance"]
+
+    # Column ranges and widths; these must be set before any rows are written
+    COLUMN_WIDTHS = (
+        ('A:A', 12),  # Date
+        ('B:B', 50),  # Description
+        ('C:C', 15),  # Reference
+        ('D:F', 12),  # Debit, Credit, Balance
+    )
+
+    # Cell format properties, turned into one shared Format per workbook
+    HEADER_FORMAT = {
+        'bold': True, 'font_size': 12, 'font_color': '#FFFFFF', 'bg_color': '#4472C4',
+        'align': 'center', 'valign': 'vcenter', 'border': 1
+    }
+    TEXT_FORMAT = {'border': 1, 'valign': 'vcenter'}
+    AMOUNT_TEXT_FORMAT = {'border': 1, 'align': 'right', 'valign': 'vcenter'}
+    NUMBER_FORMAT = dict(AMOUNT_TEXT_FORMAT, num_format='#,##0.00')
+
     def __init__(self, transactions: List[Dict], output_dir: str = "outputs"):
         self.transactions = transactions
         self.output_dir = output_dir
-        
+
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
-    
+
     def generate(self, filename: str = "transactions.xlsx") -> str:
         """Generate Excel file and return the file path"""
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Bank Transactions"
-        
-        # Define column headers
-        headers = ["Date", "Description", "Reference", "Debit", "Credit", "Balance"]
-        ws.append(headers)
-        
-        # Style the header row
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-        
-        # Add transaction data
-        for transaction in self.transactions:
-            row = [
-                transaction.get('date', ''),
-                transaction.get('description', ''),
-                transaction.get('reference', ''),
-                transaction.get('debit', ''),
-                transaction.get('credit', ''),
-                transaction.get('balance', '')
-            ]
-            ws.append(row)
-        
-        # Apply formatting to all cells
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=6):
-            for cell in row:
-                cell.border = thin_border
-                if cell.row > 1:  # Don't center-align header
-                    cell.alignment = Alignment(vertical="center")
-        
-        # Auto-size columns
-        column_widths = {
-            'A': 12,  # Date
-            'B': 50,  # Description
-            'C': 15,  # Reference
-            'D': 12,  # Debit
-            'E': 12,  # Credit
-            'F': 12   # Balance
-        }
-        
-        for col, width in column_widths.items():
-            ws.column_dimensions[col].width = width
-        
-        # Format amount columns as currency (right-aligned)
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=4, max_col=6):
-            for cell in row:
-                cell.alignment = Alignment(horizontal="right", vertical="center")
-                # Add number format if cell has a value
-                if cell.value:
-                    try:
-                        # Try to convert to float for proper number formatting
-                        float_val = float(str(cell.value).replace(',', ''))
-                        cell.value = float_val
-                        cell.number_format = '#,##0.00'
-                    except (ValueError, TypeError):
-                        pass
-        
+        filepath = os.path.join(self.output_dir, filename)
+
+        # constant_memory streams each row to disk once it is complete,
+        # so rows must be written strictly in order
+        wb = xlsxwriter.Workbook(filepath, {'constant_memory': True, 'strings_to_numbers': False})
+        ws = wb.add_worksheet("Bank Transactions")
+
+        # Formats are created once per workbook and shared by every cell
+        header_fmt = wb.add_format(self.HEADER_FORMAT)
+        text_fmt = wb.add_format(self.TEXT_FORMAT)
+        amount_text_fmt = wb.add_format(self.AMOUNT_TEXT_FORMAT)
+        num_fmt = wb.add_format(self.NUMBER_FORMAT)
+
+        for columns, width in self.COLUMN_WIDTHS:
+            ws.set_column(columns, width)
+
+        ws.write_row(0, 0, self.HEADERS, header_fmt)
+
+        # Column arrays with every amount already parsed, so the row loop only picks a writer
+        table = build_table(self.transactions)
+
+        # Look the columns up once rather than once per cell
+        text_columns = [table[key] for key in TEXT_FIELDS]
+        amount_columns = [(table[key + '_value'], table[key]) for key in AMOUNT_FIELDS]
+        first_amount_col = len(TEXT_FIELDS)
+
+        # Add transaction data in a single pass
+        for i in range(len(self.transactions)):
+            row_idx = i + 1
+            for col_idx, column in enumerate(text_columns):
+                self._write_text(ws, row_idx, col_idx, column[i], text_fmt)
+            for col_idx, (values, texts) in enumerate(amount_columns, start=first_amount_col):
+                value = values[i]
+                if not np.isnan(value):
+                    ws.write_number(row_idx, col_idx, value, num_fmt)
+                else:
+                    self._write_text(ws, row_idx, col_idx, texts[i], amount_text_fmt)
+
         # Freeze the header row
-        ws.freeze_panes = "A2"
-        
+        ws.freeze_panes(1, 0)
+
         # Save the workbook
-        filepath = os.path.join(self.output_dir, filename)
-        wb.save(filepath)
-        
+        wb.close()
+
         return filepath
-    
+
+    @staticmethod
+    def _write_text(ws, row: int, col: int, value, fmt):
+        """Write a text cell, keeping the border on empty cells"""
+        if value:
+            ws.write_string(row, col, str(value), fmt)
+        else:
+            ws.write_blank(row, col, None, fmt)
+
     def generate_with_timestamp(self) -> str:
         """Generate Excel file with timestamp in filename"""
         from datetime import datetime
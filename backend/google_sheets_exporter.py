@@ -3,8 +3,20 @@ from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from typing import List, Dict
+import google_auth_httplib2
+import httplib2
 import json
+import math
 import os
+import threading
+
+from transaction_processor import TEXT_FIELDS, AMOUNT_FIELDS, build_table
+
+# Built services are shared across requests, keyed by credentials file, since
+# build() parses the whole Sheets discovery document. httplib2 connections are
+# not thread-safe, so each exporter still makes its requests over its own Http.
+_SERVICES = {}
+_SERVICES_LOCK = threading.Lock()
 
 
 class GoogleSheetsExporter:
@@ -23,32 +35,47 @@ class GoogleSheetsExporter:
         """
         self.credentials_json = credentials_json or self.SERVICE_ACCOUNT_FILE
         self.service = None
+        self._http = None
     
     def _get_service(self):
-        """Get or create Google Sheets API service"""
+        """Get the shared Google Sheets API service, creating it on first use"""
         if self.service:
             return self.service
         
         try:
-            # Try to load service account credentials
-            if os.path.exists(self.credentials_json):
-                credentials = service_account.Credentials.from_service_account_file(
-                    self.credentials_json, scopes=self.SCOPES
-                )
-                self.service = build('sheets', 'v4', credentials=credentials)
-                return self.service
-            else:
-                raise FileNotFoundError(
-                    "Google Sheets credentials not found. "
-                    "Please provide a service account JSON file."
-                )
+            with _SERVICES_LOCK:
+                cached = _SERVICES.get(self.credentials_json)
+                if cached is None:
+                    # Try to load service account credentials
+                    if not os.path.exists(self.credentials_json):
+                        raise FileNotFoundError(
+                            "Google Sheets credentials not found. "
+                            "Please provide a service account JSON file."
+                        )
+                    credentials = service_account.Credentials.from_service_account_file(
+                        self.credentials_json, scopes=self.SCOPES
+                    )
+                    service = build('sheets', 'v4', credentials=credentials, cache_discovery=False)
+                    cached = _SERVICES[self.credentials_json] = (credentials, service)
+            
+            credentials, self.service = cached
+            # One keep-alive connection for all calls made by this exporter
+            self._http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+            return self.service
+        except FileNotFoundError:
+            # Callers fall back to Excel when credentials are missing
+            raise
         except Exception as e:
             raise Exception(f"Failed to authenticate with Google Sheets API: {str(e)}")
     
-    def create_spreadsheet(self, title: str = "Bank Transactions") -> tuple:
+    def create_spreadsheet(self, title: str = "Bank Transactions", row_count: int = 1000) -> tuple:
         """
         Create a new Google Spreadsheet
         
+        Args:
+            title: Spreadsheet title
+            row_count: Number of rows in the Transactions sheet
+        
         Returns:
             tuple: (spreadsheet_id, spreadsheet_url)
         """
@@ -60,8 +87,11 @@ class GoogleSheetsExporter:
             },
             'sheets': [{
                 'properties': {
+                    'sheetId': 0,
                     'title': 'Transactions',
                     'gridProperties': {
+                        'rowCount': row_count,
+                        'columnCount': 6,
                         'frozenRowCount': 1
                     }
                 }
@@ -72,7 +102,7 @@ class GoogleSheetsExporter:
             spreadsheet = service.spreadsheets().create(
                 body=spreadsheet,
                 fields='spreadsheetId,spreadsheetUrl'
-            ).execute()
+            ).execute(http=self._http)
             
             spreadsheet_id = spreadsheet.get('spreadsheetId')
             spreadsheet_url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/edit"
@@ -100,54 +130,72 @@ class GoogleSheetsExporter:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
             spreadsheet_title = f"Bank Transactions - {timestamp}"
         
-        spreadsheet_id, spreadsheet_url = self.create_spreadsheet(spreadsheet_title)
-        
         # Prepare data
         headers = [["Date", "Description", "Reference", "Debit", "Credit", "Balance"]]
-        
-        rows = []
-        for transaction in transactions:
-            row = [
-                transaction.get('date', ''),
-                transaction.get('description', ''),
-                transaction.get('reference', ''),
-                transaction.get('debit', ''),
-                transaction.get('credit', ''),
-                transaction.get('balance', '')
-            ]
-            rows.append(row)
+        rows = self._build_rows(transactions)
         
         # Combine headers and data
         values = headers + rows
         
-        # Write data to sheet
+        # The sheet is sized up front because updateCells does not grow the grid
+        spreadsheet_id, spreadsheet_url = self.create_spreadsheet(spreadsheet_title, row_count=len(values))
+        
+        # Write data and formatting in a single request
+        requests = [
+            {
+                'updateCells': {
+                    'start': {
+                        'sheetId': 0,
+                        'rowIndex': 0,
+                        'columnIndex': 0
+                    },
+                    'rows': [{'values': [self._cell(value) for value in row]} for row in values],
+                    'fields': 'userEnteredValue'
+                }
+            }
+        ] + self._format_requests()
+        
         body = {
-            'values': values
+            'requests': requests
         }
         
         service = self._get_service()
         
         try:
-            service.spreadsheets().values().update(
+            service.spreadsheets().batchUpdate(
                 spreadsheetId=spreadsheet_id,
-                range='Transactions!A1',
-                valueInputOption='RAW',
                 body=body
-            ).execute()
-            
-            # Format the sheet
-            self._format_sheet(spreadsheet_id)
+            ).execute(http=self._http)
             
             return spreadsheet_url
             
         except HttpError as error:
             raise Exception(f"Failed to write data to spreadsheet: {error}")
     
-    def _format_sheet(self, spreadsheet_id: str):
-        """Apply formatting to the spreadsheet"""
-        service = self._get_service()
-        
-        requests = [
+    @staticmethod
+    def _build_rows(transactions: List[Dict]) -> List[List]:
+        """Build sheet rows, with amounts as numbers so the sheet can sort and sum them"""
+        table = build_table(transactions)
+        columns = [table[key] for key in TEXT_FIELDS]
+        for key in AMOUNT_FIELDS:
+            columns.append([
+                float(number) if not math.isnan(number) else raw
+                for number, raw in zip(table[key + '_value'], table[key])
+            ])
+        return [list(row) for row in zip(*columns)]
+    
+    @staticmethod
+    def _cell(value) -> Dict:
+        """Convert a row value to updateCells CellData"""
+        if isinstance(value, float):
+            return {'userEnteredValue': {'numberValue': value}}
+        if value == '' or value is None:
+            return {}
+        return {'userEnteredValue': {'stringValue': str(value)}}
+    
+    def _format_requests(self) -> List[Dict]:
+        """Build the batchUpdate requests that format the Transactions sheet"""
+        return [
             # Format header row
             {
                 'repeatCell': {
@@ -178,6 +226,26 @@ class GoogleSheetsExporter:
                     'fields': 'userEnteredFormat(backgroundColor,textFormat,horizontalAlignment)'
                 }
             },
+            # Format amount columns
+            {
+                'repeatCell': {
+                    'range': {
+                        'sheetId': 0,
+                        'startRowIndex': 1,
+                        'startColumnIndex': 3,
+                        'endColumnIndex': 6
+                    },
+                    'cell': {
+                        'userEnteredFormat': {
+                            'numberFormat': {
+                                'type': 'NUMBER',
+                                'pattern': '#,##0.00'
+                            }
+                        }
+                    },
+                    'fields': 'userEnteredFormat.numberFormat'
+                }
+            },
             # Auto-resize columns
             {
                 'autoResizeDimensions': {
@@ -205,19 +273,6 @@ class GoogleSheetsExporter:
                 }
             }
         ]
-        
-        body = {
-            'requests': requests
-        }
-        
-        try:
-            service.spreadsheets().batchUpdate(
-                spreadsheetId=spreadsheet_id,
-                body=body
-            ).execute()
-        except HttpError as error:
-            # Formatting is optional, don't fail if it errors
-            print(f"Warning: Failed to format spreadsheet: {error}")
     
     def export_to_existing_sheet(self, transactions: List[Dict], spreadsheet_id: str, range_name: str = "Transactions!A1") -> bool:
         """
@@ -235,18 +290,7 @@ class GoogleSheetsExporter:
         
         # Prepare data
         headers = [["Date", "Description", "Reference", "Debit", "Credit", "Balance"]]
-        
-        rows = []
-        for transaction in transactions:
-            row = [
-                transaction.get('date', ''),
-                transaction.get('description', ''),
-                transaction.get('reference', ''),
-                transaction.get('debit', ''),
-                transaction.get('credit', ''),
-                transaction.get('balance', '')
-            ]
-            rows.append(row)
+        rows = self._build_rows(transactions)
         
         values = headers + rows
         body = {'values': values}
@@ -257,7 +301,7 @@ class GoogleSheetsExporter:
                 range=range_name,
                 valueInputOption='RAW',
                 body=body
-            ).execute()
+            ).execute(http=self._http)
             
             return True
             
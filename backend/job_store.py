@@ -0,0 +1,84 @@
+from typing import Dict, Optional
+import json
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class JobStore:
+    """Store conversion job metadata in Redis, or in process memory when Redis is not configured"""
+
+    def __init__(self, redis_url: str = None, ttl: int = 3600, key_prefix: str = 'job:'):
+        """
+        Initialize the store
+
+        Args:
+            redis_url: Redis connection URL. Leave empty to keep jobs in memory
+            ttl: Seconds before a job expires
+            key_prefix: Prefix for Redis keys, so several stores can share one database
+        """
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self._redis = None
+        self._memory = {}
+        self._lock = threading.Lock()
+
+        if redis_url:
+            if redis is None:
+                raise ImportError("REDIS_URL is set but the 'redis' package is not installed")
+            self._redis = redis.Redis.from_url(redis_url)
+
+    def set(self, job_id: str, data: Dict):
+        """Save job metadata"""
+        if self._redis is not None:
+            self._redis.setex(self.key_prefix + job_id, self.ttl, json.dumps(data))
+            return
+
+        with self._lock:
+            self._memory[job_id] = (time.monotonic() + self.ttl, data)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return job metadata, or None if the job is unknown or expired"""
+        if self._redis is not None:
+            raw = self._redis.get(self.key_prefix + job_id)
+            return json.loads(raw) if raw else None
+
+        with self._lock:
+            entry = self._memory.get(job_id)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self._memory[job_id]
+                return None
+            return data
+
+    def delete(self, job_id: str):
+        """Forget a job"""
+        if self._redis is not None:
+            self._redis.delete(self.key_prefix + job_id)
+            return
+
+        with self._lock:
+            self._memory.pop(job_id, None)
+
+    def purge_expired(self) -> int:
+        """
+        Drop expired jobs from memory. Redis expires keys on its own.
+
+        Returns:
+            int: Number of jobs removed
+        """
+        if self._redis is not None:
+            return 0
+
+        now = time.monotonic()
+        with self._lock:
+            expired = [job_id for job_id, (expires_at, _) in self._memory.items() if expires_at <= now]
+            for job_id in expired:
+                del self._memory[job_id]
+        return len(expired)
@@ -1,14 +1,182 @@
 import re
-import traceback
 import io
+import logging
 import os
+import shutil
+import subprocess
+import sys
+import threading
+from collections import Counter
+from contextlib import closing, contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Dict, NamedTuple, Optional, Tuple
+import numpy as np
 import pdfplumber
+import pypdfium2
 import requests
+from requests.adapters import HTTPAdapter
 from azure.ai.documentintelligence import DocumentIntelligenceClient
 from azure.core.credentials import AzureKeyCredential
 
+from transaction_processor import parse_dates
+
+try:
+    import pymupdf  # PyMuPDF: C-backed parser, used in place of pdfplumber when installed
+except ImportError:
+    pymupdf = None
+
+logger = logging.getLogger(__name__)
+
+# pdfminer logs every object it parses at DEBUG; keep it (and pdfplumber) quiet even if the app logs verbosely
+logging.getLogger("pdfminer").setLevel(logging.WARNING)
+logging.getLogger("pdfplumber").setLevel(logging.WARNING)
+
+# Poppler's pdftotext, when installed, extracts native-text PDFs far faster than pdfplumber
+PDFTOTEXT_PATH = shutil.which("pdftotext")
+PDFINFO_PATH = shutil.which("pdfinfo")
+
+# Line patterns for the text fallback parser
+_LINE_DATE_RE = re.compile(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+[A-Z][a-z]{2,3}|\d{2}\s\d{2})')
+_LINE_AMOUNT_RE = re.compile(r'-?\d{1,3}(?:[,\s]\d{3})*(?:[.,]\d{2})-?')
+# Date forms tried by _find_date, in order: 25/06/2024, 25/06, 25 Jun
+_DATE_FULL_RE = re.compile(r'(\d{1,2})[\s/-](\d{1,2})[\s/-](\d{2,4})')
+_DATE_NO_YEAR_RE = re.compile(r'\b(\d{1,2})[\s/-](\d{1,2})\b')
+_DATE_MONTH_NAME_RE = re.compile(r'(\d{1,2})\s+([A-Za-z]{3})')
+_YEAR_RE = re.compile(r'\b(202[3-6])\b')
+_CURRENCY_RE = re.compile(r'[R$£€\s]')
+_DIGIT_RE = re.compile(r'\d')
+_REFERENCE_RE = re.compile(r'\b([A-Z0-9]{8,15})\b')
+_PDFINFO_PAGES_RE = re.compile(rb'^Pages:\s+(\d+)', re.MULTILINE)
+_DATE_SEP_RE = re.compile(r'[- ]')
+_CANONICAL_DATE_RE = re.compile(r'[0-9]{2}/[0-9]{2}/[0-9]{4}')
+
+
+class Word(NamedTuple):
+    """A word on a page and its position in points. A tuple, so a page of words stays small."""
+    x0: float
+    top: float
+    x1: float
+    text: str
+
+
+class Txn:
+    """
+    A parsed statement row. Slots keep the thousands of rows in a long statement compact;
+    parse_transactions hands them out as dicts.
+    """
+    __slots__ = ('date', 'description', 'debit', 'credit', 'balance', 'reference')
+
+    def __init__(self, date: str = "", description: str = "", debit: str = "", credit: str = "",
+                 balance: str = "", reference: str = ""):
+        self.date = date
+        self.description = description
+        self.debit = debit
+        self.credit = credit
+        self.balance = balance
+        self.reference = reference
+
+    def to_dict(self) -> Dict:
+        """The row as the dict parse_transactions returns"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"Txn({self.to_dict()!r})"
+
+
+def _keyword_re(keywords) -> re.Pattern:
+    """One compiled alternation that finds any of the keywords in a single scan of the text"""
+    return re.compile('|'.join(map(re.escape, keywords)))
+
+
+# Noise keywords, each matched anywhere in lowercased text.
+# Header and footer lines that Azure sometimes returns as rows
+_NOISE_RE = _keyword_re(['standard bank', 'brought forward', 'page'])
+# Continuation lines in the visual parser that are not part of a description
+_CONTINUATION_NOISE_RE = _keyword_re(['page', 'account'])
+# Rows dropped from the final local result
+_FINAL_NOISE_RE = _keyword_re([
+    'total', 'vat', 'branch', 'account', 'statement', 'opening', 'closing', 
+    'page', 'reg no', 'fsp', 'interest', 'monthly service', 'month-end',
+    'details service', 'debits fee', 'brought forward', 'carried forward',
+    'please visit our website', 'south africa limited', 'registered bank',
+    'directors:', 'company secretary', 'authorised financial services'
+])
+
+# One C-level pass for _classify_amounts: drop currency symbols and whitespace (the same
+# characters as _CURRENCY_RE; U+3000 is the highest whitespace code point), read a comma
+# as the decimal point and a bracketed amount as negative
+_AMOUNT_TABLE = str.maketrans(
+    {**{ch: None for ch in 'R$£€'}, **{chr(c): None for c in range(0x3001) if chr(c).isspace()},
+     ',': '.', '(': '-', ')': None}
+)
+
+
+def _intern_date(date: str) -> str:
+    """Intern a DD/MM/YYYY date; anything else (e.g. OCR garbage) is returned as is, so it is not kept forever"""
+    return sys.intern(date) if _CANONICAL_DATE_RE.fullmatch(date) else date
+
+
+@lru_cache(maxsize=4096)
+def _find_date(text: str, default_year: int) -> Optional[str]:
+    """
+    Strict SA Date Specialist: Forces DD/MM order. Cached, as statements repeat the same few dates.
+    
+    Canonical results are interned, so rows with the same date share one string even when it was written differently.
+    """
+    if not text: return None
+    text = text.strip()
+    # Full formats: 25/06/2024 or 25 06 2024 (Force Day-First)
+    m = _DATE_FULL_RE.search(text)
+    if m:
+        d, mon, y = m.groups()
+        if len(y) == 2: y = "20" + y
+        # Strict validation: Day cannot be > 31, Month cannot be > 12
+        if 1 <= int(d) <= 31 and 1 <= int(mon) <= 12:
+            return _intern_date(f"{str(d).zfill(2)}/{str(mon).zfill(2)}/{y}")
+    
+    # Missing year: 25/06 or 25 06
+    m = _DATE_NO_YEAR_RE.search(text)
+    if m:
+        d, mon = m.groups()
+        try:
+            day_val, mon_val = int(d), int(mon)
+            if 1 <= day_val <= 31 and 1 <= mon_val <= 12:
+                return _intern_date(f"{str(day_val).zfill(2)}/{str(mon_val).zfill(2)}/{default_year}")
+        except ValueError: pass
+        
+    # Month names: 25 Jun
+    m = _DATE_MONTH_NAME_RE.search(text)
+    if m:
+        d, mon_name = m.groups()
+        try:
+            mon = datetime.strptime(mon_name, '%b').month
+            return _intern_date(f"{str(d).zfill(2)}/{str(mon).zfill(2)}/{default_year}")
+        except ValueError: pass
+        
+    return None
+
+
+def _field_content(fields: Dict, name: str) -> str:
+    """Literal text of an Azure field, or '' when the field is missing"""
+    field = fields.get(name)
+    return field.content if field else ""
+
+
+@lru_cache(maxsize=4096)
+def _canon_date(date: str) -> str:
+    """Azure dates as DD/MM/YYYY: any '-' or ' ' separator becomes '/', and day and month are zero-padded"""
+    if not date: return date
+    date = _DATE_SEP_RE.sub('/', date)
+    parts = date.split('/')
+    if len(parts) == 3:
+        return _intern_date(f"{parts[0].zfill(2)}/{parts[1].zfill(2)}/{parts[2]}")
+    return date
+
+
 class PDFParser:
     """Hybrid Parser: Uses Azure AI Document Intelligence with a local fallback"""
     
@@ -16,65 +184,129 @@ class PDFParser:
     # REQUIRED: Add your Azure credentials here to enable professional AI parsing
     AZURE_ENDPOINT = os.getenv("AZURE_ENDPOINT", "https://bankstatementconverter.cognitiveservices.azure.com/")
     AZURE_KEY = os.getenv("AZURE_KEY", "")
+    # Azure runs alongside the local parser; its rows are preferred if they arrive within this many seconds,
+    # and after that whichever parser finishes first is used
+    AZURE_WAIT = float(os.getenv("AZURE_WAIT", "5"))
     
     # Legacy OCR.space API key
     OCR_API_KEY = os.getenv("OCR_API_KEY", "")
     OCR_API_URL = "https://api.ocr.space/parse/image"
     
+    PDFTOTEXT_TIMEOUT = 15  # seconds
+    # Longer statements are split into page ranges converted by parallel pdftotext processes
+    PDFTOTEXT_PAGES_PER_RUN = 8
+    PDFTOTEXT_MAX_WORKERS = min(8, os.cpu_count() or 1)
+    OCR_MAX_WORKERS = 4  # concurrent OCR.space requests per document
+    OCR_TIMEOUT = 30  # seconds per OCR.space request; a page that takes longer is left empty
+    
     def __init__(self, pdf_path: str):
         self.pdf_path = pdf_path
         self.extracted_text = ""
+        self._page_texts: List[str] = []  # extracted_text page by page, for header/footer lookups
         self.is_scanned = False
         self.doc_year = datetime.now().year
+        # Set when Azure's rows are used, so the local parser stops at the next page
+        self._stop = threading.Event()
+        # OCR requests for one document share keep-alive connections, one per concurrent request
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=self.OCR_MAX_WORKERS))
         
     def parse_transactions(self) -> List[Dict]:
-        """Attempt Azure AI parsing first, then fall back to local structural parser"""
-        # 1. Try Azure (The Professional Route)
-        if self.AZURE_ENDPOINT != "YOUR_AZURE_ENDPOINT_HERE" and self.AZURE_KEY != "YOUR_AZURE_KEY_HERE":
-            try:
-                print("Using Azure AI Document Intelligence...")
-                return self._parse_with_azure()
-            except Exception as e:
-                print(f"Azure AI failed, falling back to local parser: {str(e)}")
+        """Race Azure AI parsing against the local structural parser, preferring Azure's rows"""
+        if self.AZURE_ENDPOINT == "YOUR_AZURE_ENDPOINT_HERE" or self.AZURE_KEY == "YOUR_AZURE_KEY_HERE":
+            return self._parse_local()
         
-        # 2. Local Fallback (Structural Mapper)
-        print("Using local structural mapper...")
+        # Azure gets the year up front, since the local parser re-infers self.doc_year while it runs
+        default_year = self.doc_year
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            # 1. Azure (The Professional Route), with the local parser already running as a fallback
+            logger.info("Using Azure AI Document Intelligence...")
+            azure = pool.submit(self._parse_with_azure, default_year)
+            local = pool.submit(self._parse_local)
+            # Azure has the whole window; past it, it is only waited for while local is still running
+            wait([azure], timeout=self.AZURE_WAIT)
+            if not azure.done():
+                wait([azure, local], return_when=FIRST_COMPLETED)
+                if local.done() and local.exception() is not None:
+                    wait([azure])
+            if azure.done():
+                try:
+                    rows = azure.result()
+                    if rows:
+                        # Stop the local parse and let it exit before returning: PyMuPDF and pdfium are not
+                        # thread-safe, and the caller may delete the PDF. It stops after its current page or
+                        # pdftotext run; OCR requests still in flight are abandoned.
+                        self._stop.set()
+                        wait([local])
+                        return [t.to_dict() for t in rows]
+                    logger.warning("Azure AI found no transactions, using local parser")
+                except Exception as e:
+                    logger.warning("Azure AI failed, falling back to local parser: %s", e)
+            else:
+                logger.warning("Azure AI is still running, using local parser")
+            return local.result()
+        finally:
+            # Only a slow Azure request can still be running here; it finishes in the background
+            pool.shutdown(wait=False)
+    
+    def _parse_local(self) -> List[Dict]:
+        """Local Fallback (Structural Mapper): visual and text parsers merged"""
+        logger.info("Using local structural mapper...")
         if not self.extracted_text:
             self.extract_text()
+        if self._stop.is_set(): return []
         self.doc_year = self._infer_year()
         
         raw_visual = self._parse_visual_greedy()
+        if self._stop.is_set(): return []
         raw_text = self._parse_text_greedy()
         
         # Merge and clean using existing logic
+        # Signatures are tuples of the row's existing strings, so no key string is built per row
         final_transactions = []
         seen_visual_sigs = set()
         
         for t in raw_visual:
-            if not (t.get('debit') or t.get('credit')): continue
-            amt = t.get('debit') or t.get('credit') or "0"
-            bal = t.get('balance') or "0"
-            sig = f"{t.get('date')}|{t.get('description', '').lower()}|{amt}|{bal}"
+            if not (t.debit or t.credit): continue
+            amt = t.debit or t.credit or "0"
+            bal = t.balance or "0"
+            sig = (t.date, t.description.lower(), amt, bal)
             final_transactions.append(t)
             seen_visual_sigs.add(sig)
             
         for t in raw_text:
-            if not (t.get('debit') or t.get('credit')): continue
-            amt = t.get('debit') or t.get('credit') or "0"
-            bal = t.get('balance') or "0"
-            sig = f"{t.get('date')}|{t.get('description', '').lower()}|{amt}|{bal}"
+            if not (t.debit or t.credit): continue
+            amt = t.debit or t.credit or "0"
+            bal = t.balance or "0"
+            sig = (t.date, t.description.lower(), amt, bal)
             if sig not in seen_visual_sigs:
                 final_transactions.append(t)
                 
-        try:
-            final_transactions.sort(key=lambda x: datetime.strptime(x['date'], '%d/%m/%Y') if x.get('date') else datetime.max)
-        except: pass
+        final_transactions = self._sort_by_date(final_transactions)
             
-        return self._clean_final(final_transactions)
+        return [t.to_dict() for t in self._clean_final(final_transactions)]
+
+    @staticmethod
+    def _sort_by_date(transactions: List[Txn]) -> List[Txn]:
+        """Stable sort by dd/mm/yyyy date with undated rows last; left unsorted if any date is invalid"""
+        dates = [t.date for t in transactions]
+        parsed = parse_dates(dates)
+        undated = np.array([not d for d in dates], dtype=bool)
+        if (np.isnat(parsed) & ~undated).any():
+            return transactions
+        keys = parsed.astype(np.int64)
+        keys[undated] = np.iinfo(np.int64).max
+        return [transactions[i] for i in np.argsort(keys, kind='stable')]
 
-    def _parse_with_azure(self) -> List[Dict]:
-        """Hybrid Mirror Engine: AI structure + Literal Coordinate Extraction"""
-        print("Starting Literal Mirror Extraction...")
+    def _parse_with_azure(self, default_year: int) -> List[Txn]:
+        """
+        Hybrid Mirror Engine: AI structure + Literal Coordinate Extraction
+        
+        Args:
+            default_year: Year for dates printed without one
+        """
+        logger.info("Starting Literal Mirror Extraction...")
         client = DocumentIntelligenceClient(
             endpoint=self.AZURE_ENDPOINT, 
             credential=AzureKeyCredential(self.AZURE_KEY)
@@ -85,10 +317,11 @@ class PDFParser:
                 poller = client.begin_analyze_document("prebuilt-bankStatement", body=f)
             result = poller.result()
         except Exception as e:
-            print(f"Azure Connection Failed: {str(e)}")
+            logger.warning("Azure Connection Failed: %s", e)
             raise e
         
-        transactions = []
+        final_list = []
+        seen = set()
         last_date = ""
         
         # We use the specialized 'Items' field because it groups rows, 
@@ -101,19 +334,20 @@ class PDFParser:
                 f = item.value
                 
                 # 1. Literal Strings from the PDF (No AI math)
-                raw_d = f.get("TransactionDate").content if f.get("TransactionDate") else ""
-                raw_tx = f.get("Description").content if f.get("Description") else ""
-                raw_w = f.get("Withdrawal").content if f.get("Withdrawal") else ""
-                raw_c = f.get("Deposit").content if f.get("Deposit") else ""
-                raw_b = f.get("Balance").content if f.get("Balance") else ""
+                date_field = f.get("TransactionDate")
+                raw_d = date_field.content if date_field else ""
+                raw_tx = _field_content(f, "Description")
+                raw_w = _field_content(f, "Withdrawal")
+                raw_c = _field_content(f, "Deposit")
+                raw_b = _field_content(f, "Balance")
                 
                 # 2. Strict Date Validation (Prevents 42/03/2026 errors)
-                dt = self._find_date(raw_d, self.doc_year)
+                dt = self._find_date(raw_d, default_year)
                 if not dt and raw_d:
                     # Fallback: Check if the AI's date value is usable
-                    val_dt = f.get("TransactionDate").value
+                    val_dt = date_field.value
                     if val_dt:
-                        dt = f"{str(val_dt.day).zfill(2)}/{str(val_dt.month).zfill(2)}/{val_dt.year or self.doc_year}"
+                        dt = f"{str(val_dt.day).zfill(2)}/{str(val_dt.month).zfill(2)}/{val_dt.year or default_year}"
                 
                 if dt: last_date = dt
                 
@@ -124,225 +358,370 @@ class PDFParser:
                 
                 # 4. Sign-Aware Amount Extraction
                 comb_amt = (raw_w or raw_c).strip()
-                is_debit = '-' in (raw_w + raw_c) or '(' in (raw_w + raw_c) or bool(raw_w)
+                raw_amounts = raw_w + raw_c
+                is_debit = bool(raw_w) or '-' in raw_amounts or '(' in raw_amounts
                 
-                if desc or comb_amt:
-                    transactions.append({
-                        'date': dt or last_date,
-                        'description': desc,
-                        'debit': comb_amt if is_debit else "",
-                        'credit': comb_amt if not is_debit else "",
-                        'balance': raw_b,
-                        'reference': ""
-                    })
-
-        # Final Pass: Deduplication and Normalization
-        final_list = []
-        seen = set()
-        for t in transactions:
-            # Safe Normalization
-            if t['date']:
-                t['date'] = t['date'].replace('-', '/').replace(' ', '/')
-                parts = t['date'].split('/')
-                if len(parts) == 3:
-                    t['date'] = f"{parts[0].zfill(2)}/{parts[1].zfill(2)}/{parts[2]}"
-            
-            t['description'] = " ".join(t['description'].split())
-            if not t['description']: continue
-            
-            # Filter noise
-            if any(k in t['description'].lower() for k in ['standard bank', 'brought forward', 'page']):
-                if not (t['debit'] or t['credit']): continue
-
-            sig = f"{t['date']}|{t['description']}|{t['debit']}|{t['credit']}"
-            if sig not in seen:
-                final_list.append(t)
-                seen.add(sig)
-
-        print(f"Extraction complete. Found {len(final_list)} transactions.")
-        return final_list
-
-        # FINAL PASS: Clean and Normalize
-        seen = set()
-        final_list = []
-        for t in transactions:
-            # Date Normalizer
-            if t['date']:
-                parts = t['date'].replace('-', '/').replace(' ', '/').split('/')
-                if len(parts) == 3:
-                    t['date'] = f"{parts[0].zfill(2)}/{parts[1].zfill(2)}/{parts[2]}"
-            
-            # Sanitizer
-            t['description'] = " ".join(t['description'].split())
-            if not t['description']: continue
-            
-            sig = f"{t['date']}|{t['description']}|{t['debit']}|{t['credit']}"
-            if sig not in seen:
-                final_list.append(t)
+                # 5. Normalize and deduplicate as each row is read
+                description = " ".join(desc.split())
+                if not description: continue
+                debit = comb_amt if is_debit else ""
+                credit = comb_amt if not is_debit else ""
+                
+                # Filter noise
+                if not (debit or credit) and _NOISE_RE.search(description.lower()): continue
+                
+                date = _canon_date(dt or last_date)
+                sig = (date, description, debit, credit)
+                if sig in seen: continue
                 seen.add(sig)
+                final_list.append(Txn(date, description, debit, credit, raw_b))
 
-        print(f"Extraction complete. Found {len(final_list)} transactions.")
+        logger.info("Extraction complete. Found %d transactions.", len(final_list))
         return final_list
 
     # --- LOCAL PARSING LOGIC (STAY AS FALLBACK) ---
 
     def extract_text(self) -> str:
+        # Fast path: digitally generated statements via pdftotext.
+        # Only pages without a usable text layer are opened again for OCR.
+        page_texts = self._extract_with_pdftotext()
+        if page_texts:
+            scanned_pages = [i for i, t in enumerate(page_texts) if len(t.strip()) < 50]
+            if scanned_pages:
+                self.is_scanned = True
+                for i, page_text in zip(scanned_pages, self._ocr_pages(scanned_pages)):
+                    page_texts[i] = page_text
+            self._page_texts = page_texts
+            self.extracted_text = "\n".join(page_texts)
+            return self.extracted_text
+        
+        if pymupdf is not None:
+            return self._extract_with_pymupdf()
+        
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
+            with pdfplumber.open(self.pdf_path) as pdf, closing(pypdfium2.PdfDocument(self.pdf_path)) as renderer, self._ocr_pool() as pool:
                 text_content = []
-                for page in pdf.pages:
+                for index, page in enumerate(pdf.pages):
+                    if self._stop.is_set(): break
                     page_text = page.extract_text()
+                    page.close()  # Drop the page's parsed objects before loading the next page
                     if not page_text or len(page_text.strip()) < 50:
                         self.is_scanned = True
-                        page_text = self._ocr_page(page)
+                        page_text = pool.submit(self._ocr_image, self._render_page(renderer, index))
                     text_content.append(page_text)
-                self.extracted_text = "\n".join(text_content)
+                self._page_texts = self._resolve(text_content)
+                self.extracted_text = "\n".join(self._page_texts)
                 return self.extracted_text
         except Exception as e:
             raise Exception(f"Failed to extract text: {str(e)}")
 
-    def _ocr_page(self, page) -> str:
+    def _extract_with_pdftotext(self) -> Optional[List[str]]:
+        """Per-page text from Poppler's pdftotext, or None if it is unavailable or fails"""
+        if not PDFTOTEXT_PATH: return None
+        page_count = self._page_count()
+        per_run = self.PDFTOTEXT_PAGES_PER_RUN
+        if not page_count or page_count <= per_run or self.PDFTOTEXT_MAX_WORKERS < 2:
+            return self._run_pdftotext()
+        
+        # Each range is a separate process, so the threads only wait on them and the work runs on several cores
+        ranges = [(first, min(first + per_run - 1, page_count)) for first in range(1, page_count + 1, per_run)]
+        with ThreadPoolExecutor(max_workers=min(self.PDFTOTEXT_MAX_WORKERS, len(ranges))) as pool:
+            chunks = list(pool.map(lambda r: self._run_pdftotext(*r), ranges))
+        if any(chunk is None for chunk in chunks): return None
+        return [page for chunk in chunks for page in chunk]
+
+    def _run_pdftotext(self, first: int = None, last: int = None) -> Optional[List[str]]:
+        """Run pdftotext over the whole file, or over pages first..last (1-based, inclusive)"""
+        cmd = [PDFTOTEXT_PATH, '-layout', '-enc', 'UTF-8']
+        if first is not None:
+            cmd += ['-f', str(first), '-l', str(last)]
+        try:
+            proc = subprocess.run(cmd + [self.pdf_path, '-'], capture_output=True, timeout=self.PDFTOTEXT_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if proc.returncode != 0: return None
+        # Pages are separated by form feeds, with one after the last page too
+        pages = proc.stdout.decode('utf-8', 'ignore').split('\f')
+        if first is not None:
+            count = last - first + 1
+            return pages[:count] if len(pages) > count else None
+        if pages and not pages[-1].strip(): pages.pop()
+        return pages or None
+
+    def _page_count(self) -> Optional[int]:
+        """Number of pages, read cheaply without parsing the content, or None if unknown"""
+        if PDFINFO_PATH:
+            try:
+                proc = subprocess.run([PDFINFO_PATH, self.pdf_path], capture_output=True, timeout=self.PDFTOTEXT_TIMEOUT)
+            except (OSError, subprocess.TimeoutExpired):
+                return None
+            match = _PDFINFO_PAGES_RE.search(proc.stdout)
+            return int(match.group(1)) if match else None
+        if pymupdf is not None:
+            try:
+                with pymupdf.open(self.pdf_path) as doc:
+                    return doc.page_count
+            except Exception:
+                return None
+        return None
+
+    def _extract_with_pymupdf(self) -> str:
+        """Same as the pdfplumber path, using PyMuPDF for text and page rendering"""
         try:
-            image = page.to_image(resolution=300)
+            with pymupdf.open(self.pdf_path) as doc, self._ocr_pool() as pool:
+                text_content = []
+                for page in doc:
+                    if self._stop.is_set(): break
+                    page_text = page.get_text("text", sort=True)
+                    if not page_text or len(page_text.strip()) < 50:
+                        self.is_scanned = True
+                        page_text = pool.submit(self._ocr_image, page.get_pixmap(dpi=300).tobytes("png"))
+                    text_content.append(page_text)
+                self._page_texts = self._resolve(text_content)
+                self.extracted_text = "\n".join(self._page_texts)
+                return self.extracted_text
+        except Exception as e:
+            raise Exception(f"Failed to extract text: {str(e)}")
+
+    def _ocr_pages(self, page_indices: List[int]) -> List[str]:
+        """OCR the given zero-based pages, loading only those pages"""
+        with self._ocr_pool() as pool:
+            if pymupdf is not None:
+                with pymupdf.open(self.pdf_path) as doc:
+                    pending = [pool.submit(self._ocr_image, doc[i].get_pixmap(dpi=300).tobytes("png"))
+                               for i in page_indices if not self._stop.is_set()]
+            else:
+                with closing(pypdfium2.PdfDocument(self.pdf_path)) as renderer:
+                    pending = [pool.submit(self._ocr_image, self._render_page(renderer, i))
+                               for i in page_indices if not self._stop.is_set()]
+            return self._resolve(pending)
+
+    @contextmanager
+    def _ocr_pool(self):
+        """
+        Thread pool for OCR requests. Pages are still rendered one at a time on the
+        calling thread (neither PDF library is thread-safe); only the HTTP round trips
+        to the OCR service overlap, with each other and with rendering the next page.
+        Once the parse is stopped, requests still in flight are not waited for.
+        """
+        pool = ThreadPoolExecutor(max_workers=self.OCR_MAX_WORKERS)
+        try:
+            yield pool
+        finally:
+            pool.shutdown(wait=not self._stop.is_set())
+
+    def _resolve(self, items: List) -> List[str]:
+        """
+        Replace OCR futures in a list of page texts with their results, keeping page order.
+        Once the parse is stopped, pages whose OCR has not finished are left empty.
+        """
+        texts = []
+        for item in items:
+            if isinstance(item, Future):
+                # Wake up now and then so a stop is noticed while a request is still in flight
+                while not item.done() and not self._stop.is_set():
+                    wait([item], timeout=0.25)
+                if item.done():
+                    item = item.result()
+                else:
+                    item.cancel()
+                    item = ""
+            texts.append(item)
+        return texts
+
+    def _render_page(self, renderer, index: int) -> Optional[bytes]:
+        """
+        Render a zero-based page to PNG for OCR, or None if it cannot be rendered.
+        Uses the open pypdfium2 document directly; pdfplumber's to_image would reopen
+        the whole file for every page.
+        """
+        try:
+            # Same settings as pdfplumber's to_image(resolution=300)
+            image = renderer[index].render(
+                scale=300 / 72, no_smoothtext=True, no_smoothpath=True, no_smoothimage=True, prefer_bgrx=True
+            ).to_pil().convert("RGB")
             img_byte_arr = io.BytesIO()
-            image.original.save(img_byte_arr, format='PNG')
-            img_byte_arr.seek(0)
+            # Fast, light compression: the OCR upload is cheaper than zlib's default effort
+            image.save(img_byte_arr, format='PNG', compress_level=1)
+            return img_byte_arr.getvalue()
+        except (pypdfium2.PdfiumError, OSError, ValueError) as e:
+            logger.debug("Could not render page %d for OCR: %s", index + 1, e)
+            return None
+
+    def _ocr_image(self, png_bytes: Optional[bytes]) -> str:
+        if not png_bytes or self._stop.is_set(): return ""
+        try:
             payload = {'apikey': self.OCR_API_KEY, 'language': 'eng', 'OCREngine': 2}
-            files = {'file': img_byte_arr}
-            response = requests.post(self.OCR_API_URL, files=files, data=payload)
+            files = {'file': ('page.png', png_bytes, 'image/png')}
+            response = self._session.post(self.OCR_API_URL, files=files, data=payload, timeout=self.OCR_TIMEOUT)
             if response.status_code == 200:
                 result = response.json()
                 return result.get('ParsedResults', [{}])[0].get('ParsedText', '')
             return ""
-        except: return ""
+        except (requests.RequestException, ValueError, LookupError, TypeError, AttributeError) as e:
+            # Network errors, or a response that is not the JSON shape OCR.space documents
+            logger.debug("OCR request failed: %s", e)
+            return ""
 
-    def _parse_visual_greedy(self) -> List[Dict]:
+    def _parse_visual_greedy(self) -> List[Txn]:
         """Professional Column-Mapper: Uses detected headers to create strict visual gutters"""
         transactions = []
         last_date = None
+        col_map = None
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                col_map = self._detect_column_map(pdf.pages[0])
-                for page in pdf.pages:
-                    words = page.extract_words(x_tolerance=3, y_tolerance=3)
-                    if not words: continue
-                    lines = []
-                    sorted_words = sorted(words, key=lambda x: x['top'])
-                    if sorted_words:
-                        curr = [sorted_words[0]]
-                        for i in range(1, len(sorted_words)):
-                            if abs(sorted_words[i]['top'] - curr[-1]['top']) <= 3: curr.append(sorted_words[i])
-                            else:
-                                lines.append(curr); curr = [sorted_words[i]]
-                        lines.append(curr)
-                    for line_words in lines:
-                        row_date_text, row_desc_parts, row_amt_parts = "", [], []
-                        for w in sorted(line_words, key=lambda x: x['x0']):
-                            assigned = False
-                            for role, gutter in col_map.items():
-                                if gutter['x0'] - 5 <= w['x0'] <= gutter['x1'] + 5:
-                                    if role == 'date': row_date_text += " " + w['text']
-                                    elif role == 'amt': row_amt_parts.append(w['text'])
-                                    elif role == 'desc': row_desc_parts.append(w['text'])
-                                    assigned = True; break
-                            if not assigned and 0.1 * page.width < w['x0'] < 0.7 * page.width:
-                                row_desc_parts.append(w['text'])
-                        found_date = self._find_date(row_date_text.strip(), self.doc_year)
-                        if found_date: last_date = found_date
-                        if row_amt_parts:
-                            debit, credit, balance = self._classify_amounts(row_amt_parts)
-                            description = " ".join(row_desc_parts).strip()
-                            if not description:
-                                description = " ".join([w['text'] for w in line_words if w['text'] not in row_amt_parts]).strip()
-                            transactions.append({'date': found_date or last_date or "", 'description': description, 'debit': debit, 'credit': credit, 'balance': balance})
-                        elif transactions and row_desc_parts:
-                            content = " ".join(row_desc_parts).strip()
-                            if len(content) > 2 and not any(kw in content.lower() for kw in ['page', 'account']):
-                                transactions[-1]['description'] += " " + content
-        except: print(traceback.format_exc())
+            for page_width, words in self._iter_page_words():
+                # Gutters come from the first page's headers
+                if col_map is None: col_map = self._detect_column_map(words, page_width)
+                if not words: continue
+                roles = self._word_roles(words, col_map, page_width)
+                lines, top_rank = self._reading_lines(words)
+                for line in lines:
+                    row_date_text, row_desc_parts, row_amt_parts = "", [], []
+                    for i in line:
+                        role = roles[i]
+                        if role == 'date': row_date_text += " " + words[i].text
+                        elif role == 'amt': row_amt_parts.append(words[i].text)
+                        elif role == 'desc': row_desc_parts.append(words[i].text)
+                    found_date = self._find_date(row_date_text.strip(), self.doc_year)
+                    if found_date: last_date = found_date
+                    if row_amt_parts:
+                        debit, credit, balance = self._classify_amounts(row_amt_parts)
+                        description = " ".join(row_desc_parts).strip()
+                        if not description:
+                            line_words = [words[i] for i in sorted(line, key=top_rank.__getitem__)]
+                            description = " ".join([w.text for w in line_words if w.text not in row_amt_parts]).strip()
+                        transactions.append(Txn(found_date or last_date or "", description, debit, credit, balance))
+                    elif transactions and row_desc_parts:
+                        content = " ".join(row_desc_parts).strip()
+                        if len(content) > 2 and not _CONTINUATION_NOISE_RE.search(content.lower()):
+                            transactions[-1].description += " " + content
+        except Exception as e:
+            # The PDF itself could not be opened; keep whatever rows were parsed
+            logger.warning("Visual parsing failed: %s", e)
         return transactions
 
-    def _detect_column_map(self, page) -> Dict:
-        words = page.extract_words()
+    @staticmethod
+    def _reading_lines(words: List[Word]) -> Tuple[List[List[int]], List[int]]:
+        """
+        Group a page's words into lines, each ordered left to right.
+        In top order, a word joins the current line while it is within 3pt of the word before it.
+        
+        Returns:
+            tuple: (lines as lists of word indices, each word's position in top order)
+        """
+        count = len(words)
+        tops = np.fromiter((w.top for w in words), dtype=np.float64, count=count)
+        x0 = np.fromiter((w.x0 for w in words), dtype=np.float64, count=count)
+        by_top = np.argsort(tops, kind='stable')
+        line_ids = np.zeros(count, dtype=np.int64)
+        np.cumsum(np.abs(np.diff(tops[by_top])) > 3, out=line_ids[1:])
+        # Two stable sorts: by x0, then by line, so words level on x0 keep their top order
+        by_x0 = np.argsort(x0[by_top], kind='stable')
+        reading = by_x0[np.argsort(line_ids[by_x0], kind='stable')]
+        top_rank = np.empty(count, dtype=np.int64)
+        top_rank[by_top] = np.arange(count)
+        pairs = zip(line_ids[reading].tolist(), by_top[reading].tolist())
+        lines = [[i for _, i in group] for _, group in groupby(pairs, key=itemgetter(0))]
+        return lines, top_rank.tolist()
+
+    @staticmethod
+    def _word_roles(words: List[Word], col_map: Dict, page_width: float) -> List[Optional[str]]:
+        """
+        Column role of every word on a page, computed for all words at once.
+        A word takes the first gutter in col_map (with 5pt of slack) that contains its x0;
+        words outside every gutter but in the middle of the page count as description.
+        """
+        x0 = np.fromiter((w.x0 for w in words), dtype=np.float64, count=len(words))
+        names = list(col_map)
+        low = np.array([col_map[role]['x0'] - 5 for role in names], dtype=np.float64)
+        high = np.array([col_map[role]['x1'] + 5 for role in names], dtype=np.float64)
+        hits = (x0[:, None] >= low) & (x0[:, None] <= high)
+        loose_desc = (0.1 * page_width < x0) & (x0 < 0.7 * page_width)
+        codes = np.where(hits.any(axis=1), hits.argmax(axis=1), np.where(loose_desc, len(names), len(names) + 1))
+        return np.array(names + ['desc', None], dtype=object)[codes].tolist()
+
+    def _iter_page_words(self):
+        """Yield (page_width, words) per page as Word tuples, skipping pages whose words cannot be read"""
+        if pymupdf is not None:
+            with pymupdf.open(self.pdf_path) as doc:
+                for index in range(doc.page_count):
+                    if self._stop.is_set(): return
+                    try:
+                        page = doc[index]
+                        words = [Word(w[0], w[1], w[2], w[4]) for w in page.get_text("words")]
+                    except Exception as e:
+                        logger.debug("Could not read words on page %d: %s", index + 1, e)
+                        continue
+                    yield page.rect.width, words
+            return
+        
+        with pdfplumber.open(self.pdf_path) as pdf:
+            for page in pdf.pages:
+                if self._stop.is_set(): return
+                try:
+                    words = [Word(w['x0'], w['top'], w['x1'], w['text']) for w in page.extract_words(x_tolerance=3, y_tolerance=3)]
+                except Exception as e:
+                    logger.debug("Could not read words on page %d: %s", page.page_number, e)
+                    continue
+                finally:
+                    page.close()  # Drop the page's parsed objects before loading the next page
+                yield page.width, words
+
+    def _detect_column_map(self, words: List[Word], page_width: float) -> Dict:
         header_roles = {'date': ['date'], 'desc': ['details', 'description', 'transaction'], 'amt': ['debit', 'amount', 'payment', 'balance']}
         gutters = {'date': {'x0': 0, 'x1': 50}, 'desc': {'x0': 60, 'x1': 300}, 'amt': {'x0': 310, 'x1': 1000}}
         found = []
         for w in words:
-            t = w['text'].lower()
+            t = w.text.lower()
             for role, kws in header_roles.items():
-                if any(kw in t for kw in kws): found.append({'role': role, 'x0': w['x0'], 'x1': w['x1']})
+                if any(kw in t for kw in kws): found.append({'role': role, 'x0': w.x0, 'x1': w.x1})
         if found:
             for role in header_roles.keys():
                 rh = [h for h in found if h['role'] == role]
                 if rh: 
                     gutters[role]['x0'] = min(h['x0'] for h in rh)
                     gutters[role]['x1'] = max(h['x1'] for h in rh)
-            gutters['desc']['x1'] = min([h['x0'] for h in found if h['x0'] > gutters['desc']['x1']] or [page.width * 0.75]) - 5
+            gutters['desc']['x1'] = min([h['x0'] for h in found if h['x0'] > gutters['desc']['x1']] or [page_width * 0.75]) - 5
         return gutters
 
-    def _parse_text_greedy(self) -> List[Dict]:
+    def _parse_text_greedy(self) -> List[Txn]:
         transactions = []
         lines = self.extracted_text.split('\n')
         last_date = None
+        has_digit, search_date, find_amounts = _DIGIT_RE.search, _LINE_DATE_RE.search, _LINE_AMOUNT_RE.findall
         for line in lines:
+            # Both patterns need a digit, so headers and address lines skip the regex work
+            if not has_digit(line): continue
             line = line.strip()
-            if not line: continue
-            date_m = re.search(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+[A-Z][a-z]{2,3}|\d{2}\s\d{2})', line)
-            amts = re.findall(r'-?\d{1,3}(?:[,\s]\d{3})*(?:[.,]\d{2})-?', line)
+            date_m = search_date(line)
+            amts = find_amounts(line)
             if date_m:
-                pd = self._find_date(date_m.group(0), self.doc_year)
-                if pd: last_date = pd
+                parsed_date = self._find_date(date_m.group(0), self.doc_year)
+                if parsed_date: last_date = parsed_date
             if amts:
                 debit, credit, balance = self._classify_amounts(amts)
                 desc = line
                 if date_m: desc = desc.replace(date_m.group(0), '')
                 for a in amts: desc = desc.replace(a, '')
-                transactions.append({'date': last_date or "", 'description': ' '.join(desc.split()).strip(), 'debit': debit, 'credit': credit, 'balance': balance})
+                transactions.append(Txn(last_date or "", ' '.join(desc.split()).strip(), debit, credit, balance))
         return transactions
 
     def _infer_year(self) -> int:
-        years = re.findall(r'\b(202[3-6])\b', self.extracted_text)
-        if years: from collections import Counter; return int(Counter(years).most_common(1)[0][0])
+        """Most common statement year in the first and last pages, where headers and footers print it"""
+        pages = self._page_texts or [self.extracted_text]
+        years = _YEAR_RE.findall(pages[0])
+        if len(pages) > 1: years += _YEAR_RE.findall(pages[-1])
+        if years: return int(Counter(years).most_common(1)[0][0])
         return datetime.now().year
 
     def _find_date(self, text: str, default_year: int) -> Optional[str]:
         """Strict SA Date Specialist: Forces DD/MM order"""
-        if not text: return None
-        text = text.strip()
-        # Full formats: 25/06/2024 or 25 06 2024 (Force Day-First)
-        m = re.search(r'(\d{1,2})[\s/-](\d{1,2})[\s/-](\d{2,4})', text)
-        if m:
-            d, mon, y = m.groups()
-            if len(y) == 2: y = "20" + y
-            # Strict validation: Day cannot be > 31, Month cannot be > 12
-            if 1 <= int(d) <= 31 and 1 <= int(mon) <= 12:
-                return f"{str(d).zfill(2)}/{str(mon).zfill(2)}/{y}"
-        
-        # Missing year: 25/06 or 25 06
-        m = re.search(r'\b(\d{1,2})[\s/-](\d{1,2})\b', text)
-        if m:
-            d, mon = m.groups()
-            try:
-                day_val, mon_val = int(d), int(mon)
-                if 1 <= day_val <= 31 and 1 <= mon_val <= 12:
-                    return f"{str(day_val).zfill(2)}/{str(mon_val).zfill(2)}/{default_year}"
-            except: pass
-            
-        # Month names: 25 Jun
-        m = re.search(r'(\d{1,2})\s+([A-Za-z]{3})', text)
-        if m:
-            d, mon_name = m.groups()
-            try:
-                mon = datetime.strptime(mon_name, '%b').month
-                return f"{str(d).zfill(2)}/{str(mon).zfill(2)}/{default_year}"
-            except: pass
-            
-        return None
+        return _find_date(text, default_year)
 
     def _is_amount(self, text: str) -> bool:
         """Strict Amount detection: Handles Comma decimal and space separators"""
         # Remove currency symbols and spaces between digits (1 000,00 -> 1000,00)
-        c = re.sub(r'[R$£€\s]', '', text)
+        c = _CURRENCY_RE.sub('', text)
         if not c: return False
         # Normalize: Replace comma decimal with period for float conversion
         c = c.replace(',', '.')
@@ -350,12 +729,12 @@ class PDFParser:
         try:
             float(c)
             # Must have digits and at least one decimal separator or be large
-            return bool(re.search(r'\d', c)) and ('.' in c or len(c) > 3)
-        except:
+            return bool(_DIGIT_RE.search(c)) and ('.' in c or len(c) > 3)
+        except ValueError:
             return False
 
     def _extract_reference(self, line: str) -> str:
-        m = re.search(r'\b([A-Z0-9]{8,15})\b', line)
+        m = _REFERENCE_RE.search(line)
         return m.group(1) if m else ""
 
     def _classify_amounts(self, amounts: List[str]) -> Tuple[str, str, str]:
@@ -365,10 +744,10 @@ class PDFParser:
         # Raw value extraction for logic
         vals = []
         for a in amounts:
-            c = re.sub(r'[R$£€\s]', '', a).replace(',', '.').replace('(', '-').replace(')', '')
+            c = a.translate(_AMOUNT_TABLE)
             if c.endswith('-'): c = '-' + c[:-1]
             try: vals.append(float(c))
-            except: vals.append(0.0)
+            except ValueError: vals.append(0.0)
 
         debit, credit, balance = "", "", ""
         
@@ -396,22 +775,17 @@ class PDFParser:
         
         return debit, credit, balance
 
-    def _clean_final(self, transactions: List[Dict]) -> List[Dict]:
+    def _clean_final(self, transactions: List[Txn]) -> List[Txn]:
         cleaned = []
-        noise = [
-            'total', 'vat', 'branch', 'account', 'statement', 'opening', 'closing', 
-            'page', 'reg no', 'fsp', 'interest', 'monthly service', 'month-end',
-            'details service', 'debits fee', 'brought forward', 'carried forward',
-            'please visit our website', 'south africa limited', 'registered bank',
-            'directors:', 'company secretary', 'authorised financial services'
-        ]
         for t in transactions:
-            d = t['description'].strip()
+            d = t.description.strip()
+            if not d or len(d) > 200: continue
+            lowered = d.lower()
             # Filter noise and empty lines
-            if not d or any(k in d.lower() for k in noise) or len(d) > 200: continue
+            if _FINAL_NOISE_RE.search(lowered): continue
             
             # Additional check: If it has "Balance" and no debit/credit, it's noise
-            if 'balance' in d.lower() and not (t.get('debit') or t.get('credit')): continue
+            if 'balance' in lowered and not (t.debit or t.credit): continue
             
             cleaned.append(t)
         return cleaned
@@ -8,10 +8,10 @@ def test():
     
     parser = PDFParser(sys.argv[1])
     try:
-        transactions = parser._parse_with_azure()
+        transactions = parser._parse_with_azure(parser.doc_year)
         print(f"Extracted {len(transactions)} transactions")
         for t in transactions[:5]:
-            print(t)
+            print(t.to_dict())
     except Exception as e:
         import traceback
         traceback.print_exc()
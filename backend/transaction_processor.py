@@ -1,7 +1,149 @@
-from typing import List, Dict
+from typing import List, Dict, Iterator
 import re
+import sys
 from datetime import datetime
-from dateutil import parser as date_parser
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+TEXT_FIELDS = ('date', 'description', 'reference')
+AMOUNT_FIELDS = ('debit', 'credit', 'balance')
+
+# Amount, reference and date cleanup
+_NON_NUMERIC_RE = re.compile(r'[^\d,.]')
+_NON_WORD_RE = re.compile(r'[^\w\d]')
+_CANONICAL_DATE_RE = re.compile(r'[0-9]{2}/[0-9]{2}/[0-9]{4}')
+
+# Common noise in descriptions, each replaced by a space in this order
+_NOISE_PATTERNS = tuple(re.compile(p) for p in (
+    r'^\s*-\s*',  # Leading dashes
+    r'\s*-\s*$',  # Trailing dashes
+    r'^\s*\*\s*',  # Leading asterisks
+    r'\s{2,}',  # Multiple spaces
+))
+
+
+# Only use Day-First formats to prevent flipping
+DATE_FORMATS = (
+    '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y',
+    '%d %b %Y', '%d %B %Y',
+    '%d/%m/%y', '%d-%m-%y',
+)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_date(date_str: str) -> str:
+    """
+    Strict Day-First Normalization for SA Statements
+    
+    Cached across instances, since a statement repeats the same few dates on many rows.
+    Normalized results are interned so every row with the same date shares one string;
+    unparseable input is returned as is rather than interned, since it would never be freed.
+    """
+    if not date_str or not date_str.strip():
+        return ''
+    
+    date_str = date_str.strip()
+    
+    # Already dd/mm/yyyy: only check it is a real date
+    if _CANONICAL_DATE_RE.fullmatch(date_str) and date_str[6] != '0':
+        try:
+            datetime(int(date_str[6:]), int(date_str[3:5]), int(date_str[:2]))
+            return sys.intern(date_str)
+        except ValueError:
+            pass
+    
+    for fmt in DATE_FORMATS:
+        try:
+            dt = datetime.strptime(date_str, fmt)
+            return sys.intern(dt.strftime('%d/%m/%Y'))
+        except ValueError:
+            continue
+    
+    # Try fuzzy parsing but FORCE dayfirst. dateutil is slow to import and rarely needed.
+    from dateutil import parser as date_parser
+    try:
+        dt = date_parser.parse(date_str, dayfirst=True)
+        return sys.intern(dt.strftime('%d/%m/%Y'))
+    except (ValueError, OverflowError):
+        pass
+    
+    return date_str
+
+
+@lru_cache(maxsize=4096)
+def _normalize_amount(amount_str: str) -> str:
+    """
+    Normalize amount to decimal format
+    
+    Cached like dates, since the same amounts recur on many rows and repeat inputs reuse one result.
+    """
+    # Handle negative amounts
+    is_negative = '-' in amount_str or '(' in amount_str
+    
+    # Keep digits and separators only; this also drops currency symbols and whitespace
+    amount_str = _NON_NUMERIC_RE.sub('', amount_str)
+    
+    # Handle different decimal separators
+    # If both a comma and a period are present, the last one is decimal
+    last_comma = amount_str.rfind(',')
+    if last_comma != -1:
+        last_period = amount_str.rfind('.')
+        if last_period > last_comma:
+            # Period is decimal separator, comma is thousands
+            amount_str = amount_str.replace(',', '')
+        elif last_period != -1:
+            # Comma is decimal separator, period is thousands
+            amount_str = amount_str.replace('.', '').replace(',', '.')
+        elif len(amount_str) - last_comma == 3 and amount_str.find(',') == last_comma:
+            # A single comma followed by 2 digits is decimal
+            amount_str = amount_str[:last_comma] + '.' + amount_str[last_comma + 1:]
+        else:
+            # It's a thousands separator
+            amount_str = amount_str.replace(',', '')
+    
+    # Convert to float and format
+    try:
+        value = float(amount_str)
+        if is_negative and value > 0:
+            value = -value
+        
+        # Format to 2 decimal places
+        return f"{value:.2f}"
+    except ValueError:
+        return ''
+
+
+def parse_dates(dates: List[str]) -> np.ndarray:
+    """
+    Parse dd/mm/yyyy dates in one pass, as datetime64[us] with NaT where a date is empty or invalid
+    
+    pandas stops at the year 2262, so later dates (e.g. an OCR-misread 01/05/2924) are retried with strptime.
+    """
+    parsed = pd.to_datetime(pd.Series(dates, dtype=object), format='%d/%m/%Y', errors='coerce')
+    parsed = parsed.to_numpy(dtype='datetime64[us]')
+    for i in np.flatnonzero(np.isnat(parsed)):
+        if dates[i]:
+            try:
+                parsed[i] = datetime.strptime(dates[i], '%d/%m/%Y')
+            except (ValueError, TypeError):
+                pass
+    return parsed
+
+
+def build_table(transactions: List[Dict]) -> Dict:
+    """
+    Column-oriented copy of processed transactions, shared by the exporters
+    
+    Each field maps to a list of its values in row order. Amount fields also get
+    a '<field>_value' float array, with NaN where the value is not numeric.
+    """
+    table = {key: [t.get(key, '') for t in transactions] for key in TEXT_FIELDS + AMOUNT_FIELDS}
+    for key in AMOUNT_FIELDS:
+        column = pd.Series(table[key], dtype=object)
+        numbers = pd.to_numeric(column.astype(str).str.replace(',', '', regex=False), errors='coerce')
+        table[key + '_value'] = numbers.to_numpy(dtype=np.float64)
+    return table
 
 
 class TransactionProcessor:
@@ -12,14 +154,14 @@ class TransactionProcessor:
     
     def process(self) -> List[Dict]:
         """Process all transactions"""
-        processed = []
-        
+        return list(self.iter_process())
+    
+    def iter_process(self) -> Iterator[Dict]:
+        """Yield each valid transaction as soon as it is normalized"""
         for transaction in self.transactions:
             processed_trans = self._process_transaction(transaction)
             if self._is_valid_transaction(processed_trans):
-                processed.append(processed_trans)
-        
-        return processed
+                yield processed_trans
     
     def _process_transaction(self, transaction: Dict) -> Dict:
         """Process and CORRECT transaction columns based on signs"""
@@ -57,33 +199,7 @@ class TransactionProcessor:
     
     def _normalize_date(self, date_str: str) -> str:
         """Strict Day-First Normalization for SA Statements"""
-        if not date_str or not date_str.strip():
-            return ''
-        
-        date_str = date_str.strip()
-        
-        # Only use Day-First formats to prevent flipping
-        formats = [
-            '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y',
-            '%d %b %Y', '%d %B %Y',
-            '%d/%m/%y', '%d-%m-%y',
-        ]
-        
-        for fmt in formats:
-            try:
-                dt = datetime.strptime(date_str, fmt)
-                return dt.strftime('%d/%m/%Y')
-            except ValueError:
-                continue
-        
-        # Try fuzzy parsing but FORCE dayfirst
-        try:
-            dt = date_parser.parse(date_str, dayfirst=True)
-            return dt.strftime('%d/%m/%Y')
-        except:
-            pass
-        
-        return date_str
+        return _normalize_date(date_str)
     
     def _clean_description(self, description: str) -> str:
         """Clean and normalize description text"""
@@ -94,15 +210,8 @@ class TransactionProcessor:
         description = ' '.join(description.split())
         
         # Remove common noise patterns
-        noise_patterns = [
-            r'^\s*-\s*',  # Leading dashes
-            r'\s*-\s*$',  # Trailing dashes
-            r'^\s*\*\s*',  # Leading asterisks
-            r'\s{2,}',  # Multiple spaces
-        ]
-        
-        for pattern in noise_patterns:
-            description = re.sub(pattern, ' ', description)
+        for pattern in _NOISE_PATTERNS:
+            description = pattern.sub(' ', description)
         
         # Capitalize properly
         description = description.strip()
@@ -125,59 +234,14 @@ class TransactionProcessor:
             return ''
         
         # Remove whitespace and special characters
-        reference = re.sub(r'[^\w\d]', '', reference)
+        reference = _NON_WORD_RE.sub('', reference)
         return reference.strip().upper()
     
     def _normalize_amount(self, amount: str) -> str:
         """Normalize amount to decimal format"""
-        if not amount or not str(amount).strip():
-            return ''
-        
-        amount_str = str(amount).strip()
-        
-        # Remove currency symbols and whitespace
-        amount_str = re.sub(r'[R$£€\s]', '', amount_str)
-        
-        # Handle negative amounts
-        is_negative = '-' in amount_str or '(' in amount_str
-        
-        # Remove non-numeric characters except decimal point and comma
-        amount_str = re.sub(r'[^\d,.]', '', amount_str)
-        
-        # Handle different decimal separators
-        # If there are multiple commas or periods, assume the last one is decimal
-        if ',' in amount_str and '.' in amount_str:
-            # Both comma and period present
-            # Check which one appears last
-            last_comma = amount_str.rfind(',')
-            last_period = amount_str.rfind('.')
-            
-            if last_period > last_comma:
-                # Period is decimal separator, comma is thousands
-                amount_str = amount_str.replace(',', '')
-            else:
-                # Comma is decimal separator, period is thousands
-                amount_str = amount_str.replace('.', '').replace(',', '.')
-        elif ',' in amount_str:
-            # Only comma present
-            # If it's the last separator and followed by 2 digits, it's decimal
-            comma_count = amount_str.count(',')
-            if comma_count == 1 and len(amount_str.split(',')[1]) == 2:
-                amount_str = amount_str.replace(',', '.')
-            else:
-                # It's a thousands separator
-                amount_str = amount_str.replace(',', '')
-        
-        # Convert to float and format
-        try:
-            value = float(amount_str)
-            if is_negative and value > 0:
-                value = -value
-            
-            # Format to 2 decimal places
-            return f"{value:.2f}"
-        except ValueError:
+        if not amount:
             return ''
+        return _normalize_amount(str(amount))
     
     def _is_valid_transaction(self, transaction: Dict) -> bool:
         """Check if transaction has minimum required data"""
@@ -200,38 +264,18 @@ class TransactionProcessor:
                 'date_range': None
             }
         
-        total_debits = 0
-        total_credits = 0
-        dates = []
+        # Amounts that do not parse as plain numbers are left out of the totals
+        debits = pd.to_numeric(pd.Series([t.get('debit', '') for t in self.transactions], dtype=object), errors='coerce')
+        credits = pd.to_numeric(pd.Series([t.get('credit', '') for t in self.transactions], dtype=object), errors='coerce')
+        total_debits = float(np.nansum(np.abs(debits.to_numpy(dtype=np.float64))))
+        total_credits = float(np.nansum(credits.to_numpy(dtype=np.float64)))
         
-        for trans in self.transactions:
-            debit = trans.get('debit', '')
-            credit = trans.get('credit', '')
-            
-            if debit:
-                try:
-                    total_debits += abs(float(debit))
-                except:
-                    pass
-            
-            if credit:
-                try:
-                    total_credits += float(credit)
-                except:
-                    pass
-            
-            date_str = trans.get('date', '')
-            if date_str:
-                try:
-                    dt = datetime.strptime(date_str, '%d/%m/%Y')
-                    dates.append(dt)
-                except:
-                    pass
+        dates = parse_dates([t.get('date', '') for t in self.transactions])
+        dates = dates[~np.isnat(dates)]
         
         date_range = None
-        if dates:
-            dates.sort()
-            date_range = f"{dates[0].strftime('%d/%m/%Y')} - {dates[-1].strftime('%d/%m/%Y')}"
+        if len(dates):
+            date_range = f"{dates.min().item().strftime('%d/%m/%Y')} - {dates.max().item().strftime('%d/%m/%Y')}"
         
         return {
             'total_transactions': len(self.transactions),